@@ -101,20 +101,35 @@ def main():
     )
 
     if query:
+        # Display answer, rendering tokens as they are generated
+        st.markdown("### Answer")
+        answer_placeholder = st.empty()
+        streamed_tokens = []
+
+        def show_token(token):
+            # None means the partial answer was abandoned, e.g. for a fallback model
+            if token is None:
+                streamed_tokens.clear()
+                answer_placeholder.empty()
+                return
+            streamed_tokens.append(token)
+            answer_placeholder.markdown("".join(streamed_tokens))
+
         with st.spinner("Searching..."):
-            results = st.session_state.rag_pipeline.search(query, allow_web_search)
+            results = st.session_state.rag_pipeline.search(
+                query, allow_web_search, on_token=show_token
+            )
 
-        # Display answer
-        st.markdown("### Answer")
-        st.markdown(results["answer"])
+        # Replace the streamed text with the final cleaned answer
+        answer_placeholder.markdown(results["answer"])
 
         # Display sources
         if results["sources"]:
             with st.expander("📚 Sources", expanded=False):
                 for i, source in enumerate(results["sources"]):
-                    st.markdown(f"**Source {i + 1}** (Score: {source['score']:.2f})")
-                    st.markdown(f"```\n{source['content']}\n```")
-                    st.json(source["metadata"])
+                    st.markdown(f"**Source {i + 1}** (Score: {source.score:.2f})")
+                    st.markdown(f"```\n{source.content}\n```")
+                    st.json(source.metadata)
                     st.divider()
 
         # Display web results if used
@@ -259,7 +274,7 @@ def main():
 
         if st.session_state.show_documents:
             with st.spinner("Loading documents..."):
-                documents = st.session_state.rag_pipeline.get_all_documents()
+                documents = st.session_state.rag_pipeline.get_all_documents_view()
 
             if documents:
                 for i, doc in enumerate(documents):
@@ -11,6 +11,7 @@ from models.data_models import CacheEntry
 from utils.logging_utils import logger
 from utils.supabase_config import SupabaseConfig
 from utils.embedding_client import get_embedding_client, EmbeddingClient
+from utils.text_utils import YEAR_RE
 
 
 class SemanticCache:
@@ -46,11 +47,7 @@ class SemanticCache:
 
     def _encode_query(self, query: str) -> np.ndarray:
         """Encode query to embedding"""
-        embedding = self.encoder.encode(query)
-        if len(embedding.shape) > 1:
-            # If the encoder returns a batch (even for a single input), take the first one
-            return embedding[0]
-        return embedding
+        return self.encoder.embed_query(query)
 
     def _record_to_cache_entry(self, record: Dict[str, Any]) -> CacheEntry:
         """Convert a Supabase record to a CacheEntry object"""
@@ -66,14 +63,21 @@ class SemanticCache:
             hit_count=record["hit_count"],
         )
 
-    def get(self, query: str) -> Optional[Tuple[str, bool]]:
-        """Retrieve from cache if similar query exists"""
-        query_embedding = self._encode_query(query).tolist()
+    def get(
+        self, query: str, query_embedding: Optional[np.ndarray] = None
+    ) -> Optional[Tuple[str, bool]]:
+        """Retrieve from cache if similar query exists
 
-        # Extract years from the query
-        import re
+        Args:
+            query: The query text
+            query_embedding: Precomputed embedding of the query (optional)
+        """
+        if query_embedding is None:
+            query_embedding = self._encode_query(query)
+        query_embedding = query_embedding.tolist()
 
-        years_in_query = set(re.findall(r"\b(19\d\d|20\d\d)\b", query))
+        # Extract years from the query
+        years_in_query = set(YEAR_RE.findall(query))
 
         # Use pgvector's similarity search to find the best match
         result = self.supabase.client.rpc(
@@ -92,7 +96,7 @@ class SemanticCache:
             cached_query = match["query"]
 
             # Extract years from the cached query
-            years_in_cached = set(re.findall(r"\b(19\d\d|20\d\d)\b", cached_query))
+            years_in_cached = set(YEAR_RE.findall(cached_query))
 
             # Log detailed information
             logger.info(f"Cache match found with similarity {similarity:.3f}")
@@ -128,10 +132,20 @@ class SemanticCache:
         logger.info("Cache MISS: No matching entries found")
         return None, False
 
-    def put(self, query: str, response: str):
-        """Store in cache"""
+    def put(
+        self, query: str, response: str, query_embedding: Optional[np.ndarray] = None
+    ):
+        """Store in cache
+
+        Args:
+            query: The query text
+            response: The response to cache
+            query_embedding: Precomputed embedding of the query (optional)
+        """
         query_hash = self._get_query_hash(query)
-        query_embedding = self._encode_query(query).tolist()
+        if query_embedding is None:
+            query_embedding = self._encode_query(query)
+        query_embedding = query_embedding.tolist()
 
         # Insert into Supabase
         record = {
@@ -2,7 +2,7 @@
 Supabase pgvector-based vector store for document retrieval.
 """
 import json
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Iterator, Optional
 import numpy as np
 
 from models.data_models import Document
@@ -10,11 +10,31 @@ from utils.logging_utils import logger
 from utils.supabase_config import SupabaseConfig
 from utils.embedding_client import get_embedding_client, EmbeddingClient
 
+# Similarity search function for each supported embedding quantization
+MATCH_FUNCTIONS = {
+    None: "match_documents",
+    "halfvec": "match_documents_halfvec",
+}
+
 class VectorStore:
     """Supabase pgvector-based vector store for document retrieval"""
     
-    def __init__(self, embedding_dim: int = 768, table_name: str = "documents", embedding_client_type: str = "nomic_ai"):
+    def __init__(self, embedding_dim: int = 768, table_name: str = "documents", embedding_client_type: str = "nomic_ai", quantization: Optional[str] = None):
+        """
+        Args:
+            embedding_dim: Dimension of the document embeddings
+            table_name: Name of the Supabase documents table
+            embedding_client_type: Type of embedding client to use
+            quantization: Precision used for similarity search: None for full
+                precision or 'halfvec' for the half-precision index created by
+                sql/setup_halfvec.sql
+        """
+        if quantization not in MATCH_FUNCTIONS:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        
         self.table_name = table_name
+        self.quantization = quantization
+        self.match_function = MATCH_FUNCTIONS[quantization]
         self.encoder = get_embedding_client(embedding_client_type)
         self.embedding_dim = self.encoder.embedding_dim
         self.supabase = SupabaseConfig()
@@ -27,19 +47,15 @@ class VectorStore:
         # Note: This assumes you've already created the table in Supabase
         # with the appropriate pgvector extension and schema
         # You would typically do this through Supabase UI or SQL migrations
+        # The HNSW index from sql/setup_pgvector.sql keeps search() off a
+        # sequential scan; the Supabase client can't run DDL to create it here
         logger.info(f"Using Supabase table: {self.table_name}")
     
     def _document_to_record(self, doc: Document) -> Dict[str, Any]:
-        """Convert a Document object to a Supabase record"""
-        if doc.embedding is None:
-            # Use the encoder to generate embeddings
-            embedding = self.encoder.encode(doc.content)
-            if len(embedding.shape) > 1:
-                # If the encoder returns a batch (even for a single input), take the first one
-                doc.embedding = embedding[0]
-            else:
-                doc.embedding = embedding
+        """Convert an embedded Document object to a Supabase record
         
+        add_documents fills in missing embeddings in batches before converting.
+        """
         # Convert numpy array to list for JSON serialization
         embedding_list = doc.embedding.tolist()
         
@@ -59,32 +75,62 @@ class VectorStore:
             embedding=np.array(record["embedding"]) if record.get("embedding") else None
         )
     
-    def add_documents(self, documents: List[Document]):
-        """Add documents to the vector store"""
-        records = [self._document_to_record(doc) for doc in documents]
+    def add_documents(self, documents: List[Document], batch_size: int = 100):
+        """Add documents to the vector store
         
-        # Insert records into Supabase
-        # Using upsert to handle duplicates based on id
-        result = self.supabase.get_table(self.table_name).upsert(records).execute()
+        Args:
+            documents: Documents to add
+            batch_size: Number of documents embedded and upserted per round-trip
+            
+        Returns:
+            The upsert result of each batch, in order (empty if no documents)
+        """
+        results = []
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            self._embed_documents(batch)
+            records = [self._document_to_record(doc) for doc in batch]
+            
+            # Insert records into Supabase
+            # Using upsert to handle duplicates based on id
+            results.append(self.supabase.get_table(self.table_name).upsert(records).execute())
         
         logger.info(f"Added {len(documents)} documents to Supabase vector store")
-        return result
+        return results
     
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[Document, float]]:
-        """Search for relevant documents using pgvector similarity search"""
-        # Generate query embedding
-        embedding = self.encoder.encode(query)
-        if len(embedding.shape) > 1:
-            # If the encoder returns a batch (even for a single input), take the first one
-            query_embedding = embedding[0].tolist()
-        else:
-            query_embedding = embedding.tolist()
+    def _embed_documents(self, documents: List[Document]):
+        """Fill in missing embeddings with a single encoder call"""
+        pending = [doc for doc in documents if doc.embedding is None]
+        if not pending:
+            return
+        
+        embeddings = self.encoder.encode([doc.content for doc in pending])
+        for doc, embedding in zip(pending, embeddings):
+            doc.embedding = embedding
+    
+    def search(
+        self, query: str, top_k: int = 5, query_embedding: Optional[np.ndarray] = None
+    ) -> List[Tuple[Document, float]]:
+        """Search for relevant documents using pgvector similarity search
+        
+        Args:
+            query: The query text
+            top_k: Number of documents to return
+            query_embedding: Precomputed embedding of the query (optional)
+            
+        Returns:
+            List of (Document, score) tuples, with scores as plain Python floats
+        """
+        # Generate query embedding unless one was provided
+        if query_embedding is None:
+            query_embedding = self.encoder.embed_query(query)
+        query_embedding = query_embedding.tolist()
         
         # Use pgvector's cosine similarity search
         # The SQL function would be something like:
         # SELECT *, embedding <=> $1 as distance FROM documents ORDER BY distance LIMIT $2
         result = self.supabase.client.rpc(
-            'match_documents',
+            self.match_function,
             {
                 'input_query_embedding': query_embedding,
                 'match_count': top_k
@@ -92,15 +138,24 @@ class VectorStore:
         ).execute()
         
         if hasattr(result, 'data') and result.data:
-            results = []
-            for item in result.data:
-                doc = self._record_to_document(item)
-                similarity_score = 1.0 - item.get('distance', 0)  # Convert distance to similarity
-                results.append((doc, similarity_score))
-            return results
+            # Convert distance to similarity
+            return [
+                (self._record_to_document(item), 1.0 - item.get('distance', 0))
+                for item in result.data
+            ]
         
         return []
         
+    def count_documents(self) -> int:
+        """Count the documents in the vector store without fetching them"""
+        result = (
+            self.supabase.get_table(self.table_name)
+            .select("id", count="exact")
+            .limit(1)
+            .execute()
+        )
+        return result.count or 0
+    
     def get_all_documents(self, limit: int = 100) -> List[Document]:
         """Get all documents from the vector store
         
@@ -125,3 +180,59 @@ class VectorStore:
         except Exception as e:
             logger.error(f"Error retrieving documents: {str(e)}")
             return []
+    
+    def iter_documents(self, limit: int = 100) -> Iterator[Document]:
+        """Iterate over documents in the vector store without their embeddings
+        
+        Args:
+            limit: Maximum number of documents to return
+            
+        Returns:
+            Iterator of Document objects with no embedding set
+        """
+        try:
+            # Skip the embedding column, which dominates the payload and
+            # isn't needed for display
+            result = (
+                self.supabase.get_table(self.table_name)
+                .select("id, content, metadata")
+                .limit(limit)
+                .execute()
+            )
+        except Exception as e:
+            logger.error(f"Error retrieving documents: {str(e)}")
+            return
+        
+        if hasattr(result, 'data') and result.data:
+            logger.info(f"Retrieved {len(result.data)} documents from vector store")
+            for record in result.data:
+                yield self._record_to_document(record)
+        else:
+            logger.info("No documents found in vector store")
+    
+    def get_document(self, doc_id: str) -> Optional[Document]:
+        """Get a single document by ID
+        
+        Args:
+            doc_id: The ID of the document
+            
+        Returns:
+            The Document, or None if it doesn't exist
+        """
+        try:
+            result = (
+                self.supabase.get_table(self.table_name)
+                .select("id, content, metadata")
+                .eq("id", doc_id)
+                .limit(1)
+                .execute()
+            )
+            
+            if hasattr(result, 'data') and result.data:
+                return self._record_to_document(result.data[0])
+            
+            return None
+            
+        except Exception as e:
+            logger.error(f"Error retrieving document {doc_id}: {str(e)}")
+            return None
@@ -3,28 +3,219 @@ Main RAG pipeline orchestrating all components with Supabase integration.
 """
 
 import os
+import re
+import functools
 import time
+import datetime
 import uuid
 import hashlib
-from typing import List, Dict, Tuple, Optional, Union, BinaryIO
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Optional, Union, BinaryIO, Callable, NamedTuple
 import openai
 from openai import OpenAI
 from dotenv import load_dotenv
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
 from models.data_models import Document
 from components.semantic_cache import SemanticCache
 from components.vector_store import VectorStore
 from components.router import AgenticRouter
 from components.web_search import BraveWebSearcher
 from utils.logging_utils import logger
+from utils.pdf_utils import extract_pdf_pages
+from utils.text_utils import YEAR_RE
 
 # Load environment variables
 load_dotenv()
 
+# Key terms marking a line of context as a relevant fact
+_FACT_TERMS_RE = re.compile(
+    r"\$|%|billion|million|revenue|sales|growth|increase|decrease", re.IGNORECASE
+)
+
+# Patterns used by RAGPipeline._clean_text, compiled once at import time.
+# Patterns that start with a number are guarded with (?<!\d) so a failed match
+# is not retried from every digit of the same number; a match can never start
+# mid-number anyway, since the attempt from the first digit would have matched
+# first. Decimals are written as \d+(?:\.\d*)? rather than \d+\.?\d* so a digit
+# run has only one way to split. Together these keep long digit runs from
+# backtracking polynomially.
+# Whitespace that needs rewriting: runs of two or more characters, or any
+# single whitespace character other than a plain space
+_WS_RE = re.compile(r"\s{2,}|[^\S ]")
+_DIGIT_RE = re.compile(r"\d")
+
+# Broken numbers with vertical text (e.g., "60.9 b i l l i o n") or with no
+# spaces (e.g., "60.9billion"), matched in a single pass
+_NUMBER_UNIT_RE = re.compile(
+    r"(?<!\d)(\d+(?:\.\d*)?)(?:\s+(?:"
+    r"(?P<spaced_billion>b\s+i\s+l\s+l\s+i\s+o\s+n)"
+    r"|(?P<spaced_million>m\s+i\s+l\s+l\s+i\s+o\s+n)"
+    r"|(?P<spaced_trillion>t\s+r\s+i\s+l\s+l\s+i\s+o\s+n))"
+    r"|(?P<joined_billion>billion)"
+    r"|(?P<joined_million>million)"
+    r"|(?P<joined_trillion>trillion))",
+    re.IGNORECASE,
+)
+_NUMBER_UNITS = {
+    "spaced_billion": "billion",
+    "spaced_million": "million",
+    "spaced_trillion": "trillion",
+    "joined_billion": "billion",
+    "joined_million": "million",
+    "joined_trillion": "trillion",
+}
+
+# Broken phrases like "whichwasup126"
+_WHICH_WAS_UP_RE = re.compile(r"which\s*was\s*up\s*(\d+(?:\.\d*)?)", re.IGNORECASE)
+
+_BROKEN_PERCENT_RE = re.compile(r"(?<!\d)(\d+)\s*\.\s*(\d+)\s*%")
+_BILLION_WHICH_WAS_UP_RE = re.compile(
+    r"(?<!\d)(\d+(?:\.\d*)?)\s*billion\s*,"
+    r"\s*which\s*was\s*up\s*(\d+(?:\.\d*)?)(\d+(?:\.\d*)?)"
+)
+_BROKEN_SENTENCE_RE = re.compile(r"([a-z])\.([a-z])", re.IGNORECASE)
+_INTERLEAVED_BILLION_RE = re.compile(
+    r"(?<!\d)(\d+)b(\d+)i(\d+)l(\d+)l(\d+)i(\d+)o(\d+)n"
+)
+
+
+def _content_fingerprint(content: str) -> str:
+    """Short non-cryptographic hash of document content, used to build file IDs"""
+    content_bytes = content.encode()
+    if xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(content_bytes)[:10]
+    # blake2b is still faster than MD5 when xxhash isn't installed
+    return hashlib.blake2b(content_bytes, digest_size=5).hexdigest()
+
+
+def _number_unit_repl(match: re.Match) -> str:
+    """Rewrite a _NUMBER_UNIT_RE match as the number followed by its unit"""
+    return f"{match.group(1)} {_NUMBER_UNITS[match.lastgroup]}"
+
+
+class SourceRef(NamedTuple):
+    """A retrieved document shown as a source for an answer"""
+
+    content: str
+    metadata: Dict
+    score: float
+
+
+# Sample 10-K data loaded into an empty vector store
+_SAMPLE_DOCUMENTS: Tuple[Document, ...] = (
+    Document(
+        id="AAPL_2023_10K_1",
+        content="Apple Inc. reported total net sales of $394.3 billion for fiscal 2023, compared to $365.8 billion for fiscal 2022. iPhone sales represented $200.6 billion of total revenue.",
+        metadata={
+            "company": "Apple Inc.",
+            "filing_type": "10-K",
+            "year": 2023,
+            "section": "Financial Performance",
+        },
+    ),
+    Document(
+        id="MSFT_2023_10K_1",
+        content="Microsoft Corporation's revenue was $211.9 billion for fiscal year 2023, an increase of 7% compared to fiscal year 2022. Azure and other cloud services revenue grew 27%.",
+        metadata={
+            "company": "Microsoft Corporation",
+            "filing_type": "10-K",
+            "year": 2023,
+            "section": "Revenue",
+        },
+    ),
+    Document(
+        id="GOOGL_2023_10K_1",
+        content="Alphabet Inc.'s revenues were $307.4 billion for the year ended December 31, 2023, compared to $282.8 billion in the prior year. Google Search revenues were $175.0 billion.",
+        metadata={
+            "company": "Alphabet Inc.",
+            "filing_type": "10-K",
+            "year": 2023,
+            "section": "Business Overview",
+        },
+    ),
+    Document(
+        id="TSLA_2023_10K_1",
+        content="Tesla, Inc. automotive revenues were $82.4 billion for the year ended December 31, 2023, compared to $71.5 billion for the year ended December 31, 2022.",
+        metadata={
+            "company": "Tesla Inc.",
+            "filing_type": "10-K",
+            "year": 2023,
+            "section": "Automotive Sales",
+        },
+    ),
+    Document(
+        id="NVDA_2023_10K_1",
+        content="NVIDIA Corporation's revenue for fiscal 2024 was a record $60.9 billion, up 126% from the previous year. Data Center revenue was $47.5 billion, up 217% from the prior year.",
+        metadata={
+            "company": "NVIDIA Corporation",
+            "filing_type": "10-K",
+            "year": 2024,
+            "section": "Financial Results",
+        },
+    ),
+)
+
+
+@functools.lru_cache(maxsize=512)
+def _clean_text_impl(text: str) -> str:
+    """Clean text by removing excessive whitespace and fixing common formatting issues
+
+    Memoized, since the same answers and web results recur across queries.
+    The cache is bounded to keep long-running Streamlit sessions from growing.
+    """
+    # Every fix below is skipped when the text can't contain a match, so
+    # already-clean text (the usual case for LLM answers) only gets scanned
+
+    # Replace multiple spaces and newlines with a single space. This also
+    # joins any vertically stacked characters onto one line. Single spaces
+    # are left alone rather than rewritten one by one.
+    text = _WS_RE.sub(" ", text)
+
+    # Every number fix needs a digit to match
+    has_digit = _DIGIT_RE.search(text) is not None
+
+    if has_digit:
+        # Fix broken numbers with vertical text (e.g., "60.9 b i l l i o n")
+        # and with no spaces (e.g., "60.9billion")
+        text = _NUMBER_UNIT_RE.sub(_number_unit_repl, text)
+
+        # Fix broken phrases like "whichwasup126"
+        text = _WHICH_WAS_UP_RE.sub(r"which was up \1%", text)
+
+        # Fix broken percentages
+        if "%" in text:
+            text = _BROKEN_PERCENT_RE.sub(r"\1.\2%", text)
+
+        # Fix specific patterns seen in examples
+        if "billion" in text:
+            text = _BILLION_WHICH_WAS_UP_RE.sub(
+                r"\1 billion, which was up \2% from \3 billion", text
+            )
+
+    # Fix broken sentences
+    if "." in text:
+        text = _BROKEN_SENTENCE_RE.sub(r"\1. \2", text)
+
+    # Final cleanup of any remaining issues
+    if has_digit:
+        text = _INTERLEAVED_BILLION_RE.sub(r"\1\2\3\4\5\6\7 billion", text)
+    text = text.replace("billion,whichwasup", "billion, which was up ")
+
+    return text.strip()
+
 
 class RAGPipeline:
     """Main RAG pipeline orchestrating all components with Supabase integration"""
 
+    # Set once the sample data is known to be in the vector store, so later
+    # pipelines in the same process (e.g. Streamlit sessions) skip the check
+    _sample_data_loaded = False
+
     def __init__(
         self,
         openai_api_key: Optional[str] = None,
@@ -40,6 +231,13 @@ class RAGPipeline:
         self.router = AgenticRouter()
         self.web_searcher = BraveWebSearcher()
 
+        # Workers for running the vector search alongside the cache lookup.
+        # Two workers so a query never queues behind the discarded search of
+        # a previous cache hit.
+        self.search_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="rag-retrieval"
+        )
+
         # Initialize OpenAI
         if openai_api_key:
             openai.api_key = openai_api_key
@@ -54,139 +252,40 @@ class RAGPipeline:
 
     def _load_sample_data_if_needed(self):
         """Load sample 10-K data if the vector store is empty"""
-        # In a real application, you would check if data exists first
-        # For simplicity, we'll always load the sample data
-        sample_documents = [
-            Document(
-                id="AAPL_2023_10K_1",
-                content="Apple Inc. reported total net sales of $394.3 billion for fiscal 2023, compared to $365.8 billion for fiscal 2022. iPhone sales represented $200.6 billion of total revenue.",
-                metadata={
-                    "company": "Apple Inc.",
-                    "filing_type": "10-K",
-                    "year": 2023,
-                    "section": "Financial Performance",
-                },
-            ),
-            Document(
-                id="MSFT_2023_10K_1",
-                content="Microsoft Corporation's revenue was $211.9 billion for fiscal year 2023, an increase of 7% compared to fiscal year 2022. Azure and other cloud services revenue grew 27%.",
-                metadata={
-                    "company": "Microsoft Corporation",
-                    "filing_type": "10-K",
-                    "year": 2023,
-                    "section": "Revenue",
-                },
-            ),
-            Document(
-                id="GOOGL_2023_10K_1",
-                content="Alphabet Inc.'s revenues were $307.4 billion for the year ended December 31, 2023, compared to $282.8 billion in the prior year. Google Search revenues were $175.0 billion.",
-                metadata={
-                    "company": "Alphabet Inc.",
-                    "filing_type": "10-K",
-                    "year": 2023,
-                    "section": "Business Overview",
-                },
-            ),
-            Document(
-                id="TSLA_2023_10K_1",
-                content="Tesla, Inc. automotive revenues were $82.4 billion for the year ended December 31, 2023, compared to $71.5 billion for the year ended December 31, 2022.",
-                metadata={
-                    "company": "Tesla Inc.",
-                    "filing_type": "10-K",
-                    "year": 2023,
-                    "section": "Automotive Sales",
-                },
-            ),
-            Document(
-                id="NVDA_2023_10K_1",
-                content="NVIDIA Corporation's revenue for fiscal 2024 was a record $60.9 billion, up 126% from the previous year. Data Center revenue was $47.5 billion, up 217% from the prior year.",
-                metadata={
-                    "company": "NVIDIA Corporation",
-                    "filing_type": "10-K",
-                    "year": 2024,
-                    "section": "Financial Results",
-                },
-            ),
-        ]
+        if RAGPipeline._sample_data_loaded:
+            return
+
+        try:
+            document_count = self.vector_store.count_documents()
+        except Exception as e:
+            # The upsert below is idempotent, so loading anyway is safe
+            logger.warning(f"Error counting documents, loading sample data: {str(e)}")
+            document_count = 0
+
+        if document_count > 0:
+            logger.info(
+                f"Vector store already has {document_count} documents, skipping sample data"
+            )
+            RAGPipeline._sample_data_loaded = True
+            return
 
         try:
-            self.vector_store.add_documents(sample_documents)
+            # add_documents writes embeddings onto the documents it is given,
+            # so hand it fresh copies and keep the shared samples unembedded
+            self.vector_store.add_documents(
+                [
+                    Document(id=doc.id, content=doc.content, metadata=dict(doc.metadata))
+                    for doc in _SAMPLE_DOCUMENTS
+                ]
+            )
+            RAGPipeline._sample_data_loaded = True
             logger.info("Sample data loaded into Supabase vector store")
         except Exception as e:
             logger.error(f"Error loading sample data: {str(e)}")
 
     def _clean_text(self, text: str) -> str:
         """Clean text by removing excessive whitespace and fixing common formatting issues"""
-        import re
-
-        # First, check if there are any vertically stacked characters
-        # This pattern looks for single characters separated by newlines or excessive spaces
-        vertical_text_pattern = r"(\d+\.?\d*)\s*\n?\s*([a-z])\s*\n?\s*([a-z])\s*\n?\s*([a-z])\s*\n?\s*([a-z])\s*\n?\s*([a-z])\s*\n?\s*([a-z])\s*\n?\s*([a-z])"
-        if re.search(vertical_text_pattern, text, re.IGNORECASE | re.DOTALL):
-            # If vertical text is detected, first join all lines and normalize spaces
-            text = re.sub(r"\s+", " ", text)
-
-        # Replace multiple spaces and newlines with a single space
-        text = re.sub(r"\s+", " ", text)
-
-        # Fix broken numbers with vertical text (e.g., "60.9 b i l l i o n")
-        text = re.sub(
-            r"(\d+\.?\d*)\s+b\s+i\s+l\s+l\s+i\s+o\s+n",
-            r"\1 billion",
-            text,
-            flags=re.IGNORECASE,
-        )
-        text = re.sub(
-            r"(\d+\.?\d*)\s+m\s+i\s+l\s+l\s+i\s+o\s+n",
-            r"\1 million",
-            text,
-            flags=re.IGNORECASE,
-        )
-        text = re.sub(
-            r"(\d+\.?\d*)\s+t\s+r\s+i\s+l\s+l\s+i\s+o\s+n",
-            r"\1 trillion",
-            text,
-            flags=re.IGNORECASE,
-        )
-
-        # Fix broken numbers with no spaces (e.g., "60.9billion")
-        text = re.sub(r"(\d+\.?\d*)billion", r"\1 billion", text, flags=re.IGNORECASE)
-        text = re.sub(r"(\d+\.?\d*)million", r"\1 million", text, flags=re.IGNORECASE)
-        text = re.sub(r"(\d+\.?\d*)trillion", r"\1 trillion", text, flags=re.IGNORECASE)
-
-        # Fix broken phrases like "whichwasup126"
-        text = re.sub(
-            r"which\s*was\s*up\s*(\d+\.?\d*)",
-            r"which was up \1%",
-            text,
-            flags=re.IGNORECASE,
-        )
-        text = re.sub(
-            r"whichwasup(\d+\.?\d*)", r"which was up \1%", text, flags=re.IGNORECASE
-        )
-
-        # Fix broken percentages
-        text = re.sub(r"(\d+)\s*\.\s*(\d+)\s*%", r"\1.\2%", text)
-
-        # Fix specific patterns seen in examples
-        text = re.sub(
-            r"(\d+\.?\d*)\s*billion\s*,\s*which\s*was\s*up\s*(\d+\.?\d*)(\d+\.?\d*)",
-            r"\1 billion, which was up \2% from \3 billion",
-            text,
-        )
-
-        # Fix broken sentences
-        text = re.sub(r"([a-z])\.([a-z])", r"\1. \2", text, flags=re.IGNORECASE)
-
-        # Final cleanup of any remaining issues
-        text = re.sub(
-            r"(\d+)b(\d+)i(\d+)l(\d+)l(\d+)i(\d+)o(\d+)n",
-            r"\1\2\3\4\5\6\7 billion",
-            text,
-        )
-        text = re.sub(r"billion,whichwasup", r"billion, which was up ", text)
-
-        return text.strip()
+        return _clean_text_impl(text)
 
     def _generate_answer(
         self,
@@ -194,6 +293,7 @@ class RAGPipeline:
         context_docs: List[Tuple[Document, float]],
         use_web: bool = False,
         web_results: str = "",
+        on_token: Optional[Callable[[Optional[str]], None]] = None,
     ) -> str:
         """Generate answer using retrieved context and GPT-4.1 Mini"""
 
@@ -219,7 +319,7 @@ class RAGPipeline:
 
         try:
             # Use OpenAI API to generate a response with GPT-4o
-            answer = self._generate_openai_answer(query, context)
+            answer = self._generate_openai_answer(query, context, on_token)
             # Clean the answer text
             return self._clean_text(answer)
         except Exception as e:
@@ -236,8 +336,19 @@ Answer: {self._generate_mock_answer(query, context_docs, web_results)}
 Note: This is a fallback response as the AI service is currently unavailable."""
             return self._clean_text(fallback)
 
-    def _generate_openai_answer(self, query: str, context: str) -> str:
-        """Generate an answer using OpenAI's GPT-4o model with the Chat Completions API"""
+    def _generate_openai_answer(
+        self,
+        query: str,
+        context: str,
+        on_token: Optional[Callable[[Optional[str]], None]] = None,
+    ) -> str:
+        """Generate an answer using OpenAI's GPT-4o model with the Chat Completions API
+
+        If on_token is given, the answer is streamed and each token is passed
+        to it as soon as it arrives; the full answer is still returned. If a
+        partly streamed answer is abandoned, on_token receives None so the
+        tokens shown so far can be discarded.
+        """
         try:
             # Check if OpenAI API key is valid
             if not openai.api_key:
@@ -252,66 +363,72 @@ Note: This is a fallback response as the AI service is currently unavailable."""
             else:
                 logger.info("Using standard OpenAI API key (sk-)")
 
-            # We'll use the Chat Completions API with messages instead of a single prompt
+            # Create messages for Chat Completions API, shared by both models
+            messages = [
+                {
+                    "role": "system",
+                    "content": "You are a helpful financial research assistant.",
+                },
+                {
+                    "role": "user",
+                    "content": f"Context information:\n\n{context}\n\nQuestion: {query}",
+                },
+            ]
 
             # Call the OpenAI API with GPT-4o
             try:
-                # Create messages for Chat Completions API
-                messages = [
-                    {
-                        "role": "system",
-                        "content": "You are a helpful financial research assistant.",
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Context information:\n\n{context}\n\nQuestion: {query}",
-                    },
-                ]
-
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-4o",  # Using the GPT-4o model
-                    messages=messages,
-                    temperature=0.3,  # Lower temperature for more factual responses
-                    max_tokens=1000,
-                )
-
-                # Extract and return the generated answer
-                answer = response.choices[0].message.content.strip()
+                answer = self._create_chat_completion("gpt-4o", messages, on_token)
             except Exception as e:
                 logger.error(
                     f"Error in OpenAI Chat Completions API call with gpt-4o: {str(e)}"
                 )
-                # Try fallback to gpt-3.5-turbo
+                # Try fallback to gpt-3.5-turbo, discarding any partial
+                # gpt-4o answer that was already streamed
                 logger.info("Falling back to gpt-3.5-turbo model")
-
-                # Create messages for Chat Completions API
-                messages = [
-                    {
-                        "role": "system",
-                        "content": "You are a helpful financial research assistant.",
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Context information:\n\n{context}\n\nQuestion: {query}",
-                    },
-                ]
-
-                # Call the Chat Completions API with gpt-3.5-turbo as fallback
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=messages,
-                    temperature=0.3,
-                    max_tokens=1000,
+                if on_token is not None:
+                    on_token(None)
+                answer = self._create_chat_completion(
+                    "gpt-3.5-turbo", messages, on_token
                 )
-
-                answer = response.choices[0].message.content.strip()
             return answer
 
         except Exception as e:
             logger.error(f"Error in OpenAI API call: {str(e)}")
+            if on_token is not None:
+                on_token(None)
             # Use enhanced mock answer instead of raising an exception
             return self._generate_enhanced_mock_answer(query, context)
 
+    def _create_chat_completion(
+        self,
+        model: str,
+        messages: List[Dict],
+        on_token: Optional[Callable[[Optional[str]], None]] = None,
+    ) -> str:
+        """Call the Chat Completions API, streaming tokens to on_token if given"""
+        response = self.openai_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.3,  # Lower temperature for more factual responses
+            max_tokens=1000,
+            stream=on_token is not None,
+        )
+
+        if on_token is None:
+            # Extract and return the generated answer
+            return response.choices[0].message.content.strip()
+
+        tokens = []
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                tokens.append(token)
+                on_token(token)
+
+        return "".join(tokens).strip()
+
     def _generate_enhanced_mock_answer(self, query: str, context: str) -> str:
         """Generate a more sophisticated mock answer when OpenAI API is unavailable"""
         # Extract key information from context
@@ -319,27 +436,13 @@ Note: This is a fallback response as the AI service is currently unavailable."""
         relevant_facts = []
 
         for line in context_lines:
+            # Look for sentences with numbers, dates, or key terms
             if (
                 line
-                and not line.startswith("Document")
-                and not line.startswith("Web Information")
+                and not line.startswith(("Document", "Web Information"))
+                and _FACT_TERMS_RE.search(line)
             ):
-                # Look for sentences with numbers, dates, or key terms
-                if any(
-                    term in line.lower()
-                    for term in [
-                        "$",
-                        "%",
-                        "billion",
-                        "million",
-                        "revenue",
-                        "sales",
-                        "growth",
-                        "increase",
-                        "decrease",
-                    ]
-                ):
-                    relevant_facts.append(line.strip())
+                relevant_facts.append(line.strip())
 
         # Generate a structured answer
         answer_parts = []
@@ -372,14 +475,46 @@ Note: This is a fallback response as the AI service is currently unavailable."""
 
         return "Based on the retrieved information, here's what I found relevant to your query."
 
-    def search(self, query: str, allow_web_search: bool = False) -> Dict:
-        """Main search function"""
+    def search(
+        self,
+        query: str,
+        allow_web_search: bool = False,
+        on_token: Optional[Callable[[Optional[str]], None]] = None,
+    ) -> Dict:
+        """Main search function
+
+        Args:
+            query: The user's question
+            allow_web_search: Whether web search may be used
+            on_token: Optional callback receiving answer tokens as they are
+                generated, for incremental display, or None when the tokens
+                streamed so far should be discarded (e.g. before a model
+                fallback). The returned answer is the full cleaned text
+                either way.
+        """
         start_time = time.time()
 
+        # Embed the query once for the cache lookup, the vector search and
+        # the cache insert. Both components use the same embedding client type.
+        query_embedding = self.vector_store.encoder.embed_query(query)
+
+        # Start searching local documents while the cache is checked. Most
+        # queries miss the cache, so this hides the vector search latency
+        # behind the cache lookup instead of paying for both in sequence.
+        # The cache lookup is itself an RPC, so it can't cheaply go first;
+        # the trade-off is that cache hits also run a vector search.
+        retrieval = self.search_executor.submit(
+            self.vector_store.search, query, 5, query_embedding
+        )
+
         # Check cache first
-        cached_response, cache_hit = self.cache.get(query)
+        cached_response, cache_hit = self.cache.get(query, query_embedding)
         cache_debug = {"query": query}
         if cache_hit:
+            # The speculative search result isn't needed. This only cancels it
+            # if it is still queued behind other searches; usually it has
+            # already started and runs to completion in the background.
+            retrieval.cancel()
             return {
                 "answer": cached_response,
                 "sources": [],
@@ -394,8 +529,8 @@ Note: This is a fallback response as the AI service is currently unavailable."""
         routing_decision = self.router.route_query(query)
         web_results = ""
 
-        # Always search local documents first
-        retrieved_docs = self.vector_store.search(query, top_k=5)
+        # Collect the local document search started before the cache lookup
+        retrieved_docs = retrieval.result()
 
         # Check if we found any relevant documents
         has_relevant_docs = False
@@ -404,14 +539,10 @@ Note: This is a fallback response as the AI service is currently unavailable."""
             has_relevant_docs = any(score > 0.7 for _, score in retrieved_docs)
 
         # Check if query contains a year
-        import re
-
-        years_in_query = re.findall(r"\b(19\d\d|20\d\d)\b", query)
+        years_in_query = YEAR_RE.findall(query)
         contains_recent_year = False
         if years_in_query:
             # Get current year
-            import datetime
-
             current_year = datetime.datetime.now().year
             # Check if any year in query is recent (current year, last year, or next year)
             contains_recent_year = any(
@@ -435,22 +566,18 @@ Note: This is a fallback response as the AI service is currently unavailable."""
 
         # Generate answer
         answer = self._generate_answer(
-            query, retrieved_docs, allow_web_search, web_results
+            query, retrieved_docs, allow_web_search, web_results, on_token
         )
 
         # Cache the response
-        self.cache.put(query, answer)
+        self.cache.put(query, answer, query_embedding)
 
         response_time = time.time() - start_time
 
         return {
             "answer": answer,
             "sources": [
-                {
-                    "content": doc.content[:200] + "...",
-                    "metadata": doc.metadata,
-                    "score": float(score),
-                }
+                SourceRef(f"{doc.content[:200]}...", doc.metadata, score)
                 for doc, score in retrieved_docs
             ],
             "cache_hit": False,
@@ -528,33 +655,29 @@ Note: This is a fallback response as the AI service is currently unavailable."""
             elif file_name.endswith(".txt"):
                 file_type = "text/plain"
 
-        # Make a copy of the file content for processing
+        # Read the file content once; every path below works on these bytes
         file_content = file.read()
-        file.seek(0)  # Reset file pointer for further processing
+
+        # Text of each PDF page, parsed once and shared with the standard path
+        page_texts = None
 
         # Special handling for PDF files
         if file_type == "application/pdf":
             try:
-                import PyPDF2
-                import io
-
-                # Create a PDF reader object
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+                # Extract the text of every page
+                page_texts = extract_pdf_pages(file_content)
 
                 # Get the number of pages
-                num_pages = len(pdf_reader.pages)
+                num_pages = len(page_texts)
                 logger.info(f"PDF has {num_pages} pages: {file_name}")
 
                 # For large PDFs, split into chunks by page
                 if num_pages > 5:  # Threshold for splitting
                     logger.info(f"Splitting large PDF into {num_pages} chunks")
-                    doc_ids = []
+                    page_documents: List[Document] = []
 
                     # Process each page as a separate document
-                    for page_num in range(num_pages):
-                        page = pdf_reader.pages[page_num]
-                        page_text = page.extract_text()
-
+                    for page_num, page_text in enumerate(page_texts):
                         if not page_text:
                             continue  # Skip empty pages
 
@@ -569,36 +692,38 @@ Note: This is a fallback response as the AI service is currently unavailable."""
                         )
 
                         # Generate a unique ID for this page
-                        page_hash = hashlib.md5(page_text.encode()).hexdigest()[:10]
+                        page_hash = _content_fingerprint(page_text)
                         page_doc_id = f"file_{page_hash}_p{page_num + 1}"
 
                         # Create a Document object for this page
-                        page_document = Document(
-                            id=page_doc_id,
-                            content=f"[Page {page_num + 1} of {num_pages}] {page_text}",
-                            metadata=page_metadata,
+                        page_documents.append(
+                            Document(
+                                id=page_doc_id,
+                                content=f"[Page {page_num + 1} of {num_pages}] {page_text}",
+                                metadata=page_metadata,
+                            )
                         )
 
-                        # Add the page document to the vector store
-                        self.vector_store.add_documents([page_document])
-                        doc_ids.append(page_doc_id)
+                    # Add all page documents to the vector store in batches
+                    self.vector_store.add_documents(page_documents, batch_size=100)
+                    doc_ids = [doc.id for doc in page_documents]
 
                     logger.info(f"PDF split into {len(doc_ids)} documents")
                     return doc_ids
 
                 # For smaller PDFs, continue with normal processing
-                file.seek(0)  # Reset file pointer
             except Exception as e:
                 logger.error(f"Error processing PDF for chunking: {str(e)}")
                 # Continue with normal processing if PDF chunking fails
-                file.seek(0)  # Reset file pointer
 
         # Standard processing for all other files or small PDFs
-        # Read the file content
-        content = self._extract_text_from_file(file, file_name, file_type)
+        # Read the file content, reusing the PDF pages if already extracted
+        content = self._extract_text_from_file(
+            file_content, file_name, file_type, page_texts
+        )
 
         # Generate a file-specific ID based on content hash
-        content_hash = hashlib.md5(content.encode()).hexdigest()[:10]
+        content_hash = _content_fingerprint(content)
         doc_id = f"file_{content_hash}"
 
         # Create a Document object
@@ -614,15 +739,20 @@ Note: This is a fallback response as the AI service is currently unavailable."""
             raise
 
     def _extract_text_from_file(
-        self, file: BinaryIO, file_name: str, file_type: str = None
+        self,
+        file_content: bytes,
+        file_name: str,
+        file_type: str = None,
+        pdf_pages: Optional[List[str]] = None,
     ) -> str:
         """
         Extract text from a file based on its type
 
         Args:
-            file: The file object
+            file_content: The raw bytes of the file
             file_name: The name of the file
             file_type: The MIME type of the file (optional)
+            pdf_pages: Text of each page of a PDF that was already parsed (optional)
 
         Returns:
             The extracted text content
@@ -641,25 +771,21 @@ Note: This is a fallback response as the AI service is currently unavailable."""
         # Extract text based on file type
         if file_type == "text/plain":
             # For text files, just read the content
-            content = file.read().decode("utf-8")
+            content = file_content.decode("utf-8")
         elif file_type == "application/pdf":
-            # Use PyPDF2 to extract text from PDF
+            # Extract text from the PDF page by page
             try:
-                import PyPDF2
-                import io
-
-                # Create a PDF reader object
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(file.read()))
+                # Extract the text of every page unless the caller already did
+                if pdf_pages is None:
+                    pdf_pages = extract_pdf_pages(file_content)
 
-                # Get the number of pages
-                num_pages = len(pdf_reader.pages)
-                logger.info(f"PDF has {num_pages} pages: {file_name}")
+                    # Get the number of pages
+                    num_pages = len(pdf_pages)
+                    logger.info(f"PDF has {num_pages} pages: {file_name}")
 
-                # Extract text from each page
+                # Label the text of each page
                 page_texts = []
-                for page_num in range(num_pages):
-                    page = pdf_reader.pages[page_num]
-                    page_text = page.extract_text()
+                for page_num, page_text in enumerate(pdf_pages):
                     if page_text:
                         page_texts.append(f"[Page {page_num + 1}] {page_text}")
 
@@ -684,7 +810,7 @@ Note: This is a fallback response as the AI service is currently unavailable."""
         else:
             # For unknown types, just try to read as text
             try:
-                content = file.read().decode("utf-8")
+                content = file_content.decode("utf-8")
             except UnicodeDecodeError:
                 content = f"Could not extract text from file: {file_name}"
                 logger.error(f"Could not extract text from file: {file_name}")
@@ -727,3 +853,50 @@ Note: This is a fallback response as the AI service is currently unavailable."""
         except Exception as e:
             logger.error(f"Error getting documents: {str(e)}")
             return []
+
+    def get_all_documents_view(self, limit: int = 100) -> List[Dict]:
+        """
+        Get a display view of the documents in the vector store
+
+        Unlike get_all_documents, embeddings are not fetched and only the
+        truncated content is kept; use get_document for the full content.
+
+        Args:
+            limit: Maximum number of documents to return
+
+        Returns:
+            List of documents with truncated content and metadata
+        """
+        try:
+            return [
+                {
+                    "id": doc.id,
+                    "content": (
+                        doc.content[:200] + "..."
+                        if len(doc.content) > 200
+                        else doc.content
+                    ),
+                    "metadata": doc.metadata,
+                }
+                for doc in self.vector_store.iter_documents(limit)
+            ]
+
+        except Exception as e:
+            logger.error(f"Error getting documents: {str(e)}")
+            return []
+
+    def get_document(self, doc_id: str) -> Optional[Dict]:
+        """
+        Get a single document with its full content
+
+        Args:
+            doc_id: The ID of the document
+
+        Returns:
+            The document with metadata, or None if it doesn't exist
+        """
+        doc = self.vector_store.get_document(doc_id)
+        if doc is None:
+            return None
+
+        return {"id": doc.id, "content": doc.content, "metadata": doc.metadata}
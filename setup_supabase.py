@@ -79,7 +79,10 @@ def setup_supabase():
     "timestamp" TIMESTAMP NOT NULL,
     hit_count INT NOT NULL DEFAULT 1
 );""")
-    print("\n4. Create the match_documents function:")
+    print("\n4. Create the HNSW index on document embeddings:")
+    print("""CREATE INDEX IF NOT EXISTS documents_embedding_hnsw ON documents
+USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);""")
+    print("\n5. Create the match_documents function:")
     print("""CREATE OR REPLACE FUNCTION match_documents(input_query_embedding VECTOR(768), match_count INT)
 RETURNS TABLE (
     id TEXT,
@@ -103,7 +106,7 @@ BEGIN
     LIMIT match_count;
 END;
 $$ LANGUAGE plpgsql;""")
-    print("\n5. Create the match_cache_entry function:")
+    print("\n6. Create the match_cache_entry function:")
     print("""CREATE OR REPLACE FUNCTION match_cache_entry(input_query_embedding VECTOR(768), similarity_threshold FLOAT)
 RETURNS TABLE (
     query_hash TEXT,
@@ -131,6 +134,9 @@ BEGIN
     LIMIT 1;
 END;
 $$ LANGUAGE plpgsql;""")
+    print("\n7. (Optional) For half-precision search with VectorStore(quantization=\"halfvec\"),")
+    print("   run sql/setup_halfvec.sql (requires pgvector 0.7+)")
+
 
 if __name__ == "__main__":
     setup_supabase()
@@ -0,0 +1,34 @@
+-- Optional: half-precision (halfvec) search, used by VectorStore(quantization="halfvec")
+-- Run after setup_pgvector.sql, and only when halfvec search is enabled: the extra
+-- index is maintained on every insert into documents. Requires pgvector 0.7+.
+-- Indexing embeddings cast to halfvec halves the size of the HNSW graph, so more of it
+-- stays in memory and each traversal reads half the bytes. Embeddings are still stored
+-- at full precision, and returned rows are scored against them.
+-- If every search uses halfvec, documents_embedding_hnsw can be dropped.
+CREATE INDEX IF NOT EXISTS documents_embedding_halfvec_hnsw ON documents
+USING hnsw ((embedding::halfvec(768)) halfvec_cosine_ops) WITH (m = 16, ef_construction = 64);
+
+-- Create function for half-precision similarity search
+CREATE OR REPLACE FUNCTION match_documents_halfvec(input_query_embedding VECTOR(768), match_count INT)
+RETURNS TABLE (
+    id TEXT,
+    content TEXT,
+    metadata JSONB,
+    embedding VECTOR(768),
+    distance FLOAT
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        d.id,
+        d.content,
+        d.metadata,
+        d.embedding,
+        1 - (d.embedding <=> input_query_embedding) AS distance
+    FROM
+        documents d
+    ORDER BY
+        d.embedding::halfvec(768) <=> input_query_embedding::halfvec(768)
+    LIMIT match_count;
+END;
+$$ LANGUAGE plpgsql;
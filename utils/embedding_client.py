@@ -28,6 +28,22 @@ class EmbeddingClient:
         """
         raise NotImplementedError("Subclasses must implement encode method")
     
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Encode a single query to a 1-D embedding
+        
+        Args:
+            query: The query text
+            
+        Returns:
+            Numpy array with the query embedding
+        """
+        embedding = self.encode(query)
+        if len(embedding.shape) > 1:
+            # If the encoder returns a batch (even for a single input), take the first one
+            return embedding[0]
+        return embedding
+    
     @property
     def embedding_dim(self) -> int:
         """Get the embedding dimension"""
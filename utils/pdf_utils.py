@@ -0,0 +1,64 @@
+"""
+PDF text extraction utilities.
+"""
+import io
+import threading
+from typing import List
+
+# pypdfium2 (PDFium) extracts text much faster than the pure-Python PyPDF2,
+# which is kept as a fallback when it isn't installed
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# PDFium is not thread-safe: it must never be called from two threads at once,
+# even on different documents. Streamlit runs each session's script in its own
+# thread, so concurrent uploads share this lock around every PDFium call.
+_pdfium_lock = threading.Lock()
+
+
+def _extract_with_pdfium(file_content: bytes) -> List[str]:
+    """Extract the text of every page with PDFium"""
+    with _pdfium_lock:
+        pdf = pdfium.PdfDocument(file_content)
+        try:
+            page_texts = []
+            for page_num in range(len(pdf)):
+                # Close page objects explicitly so PDFium is never called from
+                # the garbage collector, outside the lock; on error, pdf.close()
+                # closes any pages still open
+                page = pdf[page_num]
+                text_page = page.get_textpage()
+                # PDFium separates lines with \r\n; match PyPDF2's \n
+                page_texts.append(text_page.get_text_range().replace("\r\n", "\n"))
+                text_page.close()
+                page.close()
+            return page_texts
+        finally:
+            pdf.close()
+
+
+def _extract_with_pypdf2(file_content: bytes) -> List[str]:
+    """Extract the text of every page with PyPDF2"""
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+    return [page.extract_text() or "" for page in pdf_reader.pages]
+
+
+def extract_pdf_pages(file_content: bytes) -> List[str]:
+    """
+    Extract the text of every page of a PDF
+
+    The document is opened once and its pages are extracted in order.
+
+    Args:
+        file_content: The raw bytes of the PDF file
+
+    Returns:
+        The text of each page in page order (empty for pages without text)
+    """
+    if pdfium is not None:
+        return _extract_with_pdfium(file_content)
+    return _extract_with_pypdf2(file_content)
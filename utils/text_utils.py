@@ -0,0 +1,7 @@
+"""
+Text pattern utilities shared by the RAG components.
+"""
+import re
+
+# Years mentioned in a query, e.g. "2023"
+YEAR_RE = re.compile(r"\b(19\d\d|20\d\d)\b")